@@ -1,17 +1,157 @@
 import re
 import os
+import time
 import asyncio
-import httpx
-from gitingest import ingest
-from typing import Any, Dict, List, Optional
+import concurrent.futures
+from dataclasses import dataclass, field
+from urllib.parse import quote
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+# httpx and gitingest are imported where they are first needed, which keeps
+# server start-up from loading gitingest's dependency graph
+if TYPE_CHECKING:
+    import httpx
+
+_URL_RE = re.compile(r"https://github\.com/([^/]+)/([^/]+)/?")
+# Loosest accepted header form; it also matches the strict "={10,}" headers.
+_FILE_HDR_RE = re.compile(r"=+\s*File:\s*([^\n]+)\s*\n=+")
+
+# Separator line around the "File: <path>" header of each returned file
+_BAR = "=" * 50
+
+# Makes the contents/blobs APIs return file bytes directly instead of base64 JSON
+_RAW_MEDIA_TYPE = "application/vnd.github.v3.raw"
+
+# Upper bound on simultaneous GitHub API requests for a batch of files
+_MAX_CONCURRENT_FETCHES = 10
+
+# Files requested per GraphQL query when fetching by exact path
+_GRAPHQL_BATCH_SIZE = 50
+
+# GitHub API responses shared across GitIngester instances, keyed by
+# (endpoint, owner, repo[, ref]) and mapped to (fetched at, ETag, parsed JSON).
+# Expired entries are revalidated with If-None-Match; a 304 reply is not
+# counted against the rate limit and skips re-downloading the body.
+_API_CACHE: Dict[Tuple, Tuple[float, Optional[str], Any]] = {}
+_API_CACHE_TTL = 60.0
+_API_CACHE_MAX_ENTRIES = 256
+
+# Dedicated threads for the blocking gitingest call, so concurrent ingests
+# don't exhaust the event loop's default executor
+_INGEST_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="gitingest"
+)
+
+# Unix time until which GitHub has reported the API rate limit exhausted.
+# Optional API requests are skipped until then; without a token the limit is
+# only 60 requests an hour.
+_rate_limited_until = 0.0
+
+
+def _scan_file_headers(content: str) -> List[Tuple[int, int, str]]:
+    """Locate "====\nFile: <path>\n====" headers with plain substring search.
+
+    Returns (header start, body start, filename) tuples. Both bars must be
+    lines of at least ten "=" characters.
+    """
+    hits = []
+    pos = 0
+    while (idx := content.find("\nFile: ", pos)) != -1:
+        pos = idx + 1
+        bar_start = content.rfind("\n", 0, idx) + 1
+        bar = content[bar_start:idx]
+        if len(bar) < 10 or bar.strip("="):
+            continue
+
+        name_end = content.find("\n", idx + 7)
+        if name_end == -1:
+            break
+        body_start = content.find("\n", name_end + 1)
+        if body_start == -1:
+            body_start = len(content)
+        bar = content[name_end + 1 : body_start]
+        if len(bar) < 10 or bar.strip("="):
+            continue
+
+        hits.append((bar_start, body_start, content[idx + 7 : name_end].strip()))
+        pos = body_start
+    return hits
+
+
+async def _record_rate_limit(response: "httpx.Response") -> None:
+    """Response hook noting when an exhausted rate limit resets."""
+    global _rate_limited_until
+    if response.status_code not in (403, 429):
+        return
+    if response.headers.get("X-RateLimit-Remaining") != "0":
+        return
+    try:
+        reset = float(response.headers["X-RateLimit-Reset"])
+    except (KeyError, ValueError):
+        reset = time.time() + 60
+    _rate_limited_until = max(_rate_limited_until, reset)
+
+
+def is_rate_limited() -> bool:
+    """Return True while GitHub's API rate limit is known to be exhausted."""
+    return time.time() < _rate_limited_until
+
+
+def create_github_client(
+    github_token: Optional[str] = None,
+    max_connections: int = _MAX_CONCURRENT_FETCHES,
+) -> "httpx.AsyncClient":
+    """Create a keep-alive httpx client with GitHub API default headers."""
+    import httpx
+
+    headers = {"Accept": "application/vnd.github.v3+json"}
+    if github_token:
+        headers["Authorization"] = f"token {github_token}"
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=30.0,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        event_hooks={"response": [_record_rate_limit]},
+    )
+
+
+@dataclass
+class FileContents:
+    """Requested files split into those found (path -> content) and those missing.
+
+    ``failed`` holds paths that exist but could not be downloaded; unlike
+    ``missing`` they may succeed on another attempt.
+    """
+
+    found: Dict[str, str] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+
 
 class GitIngester:
 
-    def __init__(self, url: str, branch: Optional[str] = None):
-        """Initialize the GitIngester with a repository URL."""
+    def __init__(
+        self,
+        url: str,
+        branch: Optional[str] = None,
+        client: Optional["httpx.AsyncClient"] = None,
+        partial_paths: Optional[List[str]] = None,
+    ):
+        """Initialize the GitIngester with a repository URL.
+
+        A ``client`` from create_github_client may be passed in to share its
+        connection pool; the ingester then leaves closing it to the caller.
+        With ``partial_paths``, fetch_repo_data only loads the repository tree
+        and those files instead of ingesting the whole repository.
+        """
         self.url: str = url
         self.branch: Optional[str] = branch
         self.github_token: Optional[str] = os.getenv("GITHUB_TOKEN")
+        # Files can be fetched per blob through the API once the tree is loaded
+        self.supports_async_files: bool = bool(self.github_token)
         self.is_private_repo: bool = False
 
         self.owner: Optional[str] = None
@@ -23,44 +163,254 @@ class GitIngester:
         self.summary: Optional[Dict[str, Any]] = None
         self.tree: Optional[Any] = None
         self.content: Optional[Any] = None
+        # Blob paths and their SHAs, populated when the GitHub API fallback runs
+        self._tree_data: Optional[List[str]] = None
+        self._sha_by_path: Optional[Dict[str, str]] = None
+        # Lookup tables over the tree, filled by _index_tree: filename ->
+        # first path, lowercased filename -> first path, and memoized
+        # resolutions of requested paths
+        self._by_filename: Dict[str, str] = {}
+        self._by_filename_lower: Dict[str, str] = {}
+        self._resolved_paths: Dict[str, Optional[str]] = {}
+        self._client: Optional["httpx.AsyncClient"] = client
+        self._owns_client: bool = client is None
+        self.partial_paths: Optional[List[str]] = partial_paths
+        # The requested files, populated by fetch_repo_data in partial mode
+        self.partial_files: Optional[FileContents] = None
 
     def _parse_github_url(self, url: str) -> None:
         """Parse GitHub URL to extract owner and repo."""
-        match = re.match(r"https://github\.com/([^/]+)/([^/]+)/?", url)
+        match = _URL_RE.match(url)
         if match:
             self.owner = match.group(1)
             self.repo = match.group(2)
 
+    async def _get_client(self) -> "httpx.AsyncClient":
+        """Return the GitHub API client, creating one on first use if needed."""
+        if self._client is None or self._client.is_closed:
+            self._client = create_github_client(self.github_token)
+            self._owns_client = True
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the GitHub API client if this ingester created it."""
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_api_json(
+        self,
+        key: Tuple,
+        url: str,
+        transform: Optional[Callable[[Any], Any]] = None,
+    ) -> Optional[Any]:
+        """GET a GitHub API URL through the shared response cache.
+
+        ``transform`` is applied to freshly parsed JSON before it is cached, so
+        only the projected data is kept alive.
+        """
+        hit = _API_CACHE.get(key)
+        if hit and time.monotonic() - hit[0] < _API_CACHE_TTL:
+            return hit[2]
+
+        headers = {}
+        if hit and hit[1]:
+            headers["If-None-Match"] = hit[1]
+
+        client = await self._get_client()
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304 and hit:
+            etag, data = hit[1], hit[2]
+        elif response.status_code == 200:
+            etag, data = response.headers.get("ETag"), response.json()
+            if transform is not None:
+                data = transform(data)
+        else:
+            return None
+
+        # Re-insert so the dict stays ordered oldest-first for eviction
+        _API_CACHE.pop(key, None)
+        if len(_API_CACHE) >= _API_CACHE_MAX_ENTRIES:
+            del _API_CACHE[next(iter(_API_CACHE))]
+        _API_CACHE[key] = (time.monotonic(), etag, data)
+        return data
+
+    async def get_head_etag(self, etag: Optional[str] = None) -> Optional[str]:
+        """Return the ETag of the branch's head commit, or None if unavailable.
+
+        When ``etag`` is given it is sent as If-None-Match, so an unchanged
+        branch costs a bodiless 304 that does not count against the rate limit;
+        the same ETag is returned in that case.
+        """
+        if not self.owner or not self.repo or is_rate_limited():
+            return None
+
+        headers = {"Accept": "application/vnd.github.sha"}
+        if etag:
+            headers["If-None-Match"] = etag
+        try:
+            client = await self._get_client()
+            response = await client.get(
+                f"https://api.github.com/repos/{self.owner}/{self.repo}/commits/{self.branch or 'HEAD'}",
+                headers=headers,
+            )
+        except Exception:
+            return None
+
+        if response.status_code == 304:
+            return etag
+        if response.status_code == 200:
+            return response.headers.get("ETag")
+        return None
+
+    async def fetch_readme(self) -> Optional[str]:
+        """Fetch README.md straight from the contents API, without ingesting.
+
+        Returns it formatted like get_content(["README.md"]), an empty string
+        if the repository has no README.md (404), or None if the fetch failed
+        or was skipped because the rate limit is exhausted.
+        """
+        if not self.owner or not self.repo or is_rate_limited():
+            return None
+
+        try:
+            client = await self._get_client()
+            response = await client.get(
+                f"https://api.github.com/repos/{self.owner}/{self.repo}/contents/README.md",
+                params={"ref": self.branch} if self.branch else {},
+                headers={"Accept": _RAW_MEDIA_TYPE},
+            )
+            if response.status_code == 404:
+                return ""
+            if response.status_code != 200:
+                return None
+            readme = response.content.decode("utf-8")
+            return self._join_file_sections({"README.md": readme})
+        except Exception:
+            return None
+
+    async def fetch_files_graphql(self, file_paths: List[str]) -> Dict[str, str]:
+        """Fetch files by exact path through batched GitHub GraphQL queries.
+
+        Up to 50 files are requested per query, without ingesting the
+        repository. Returns the content of each path that exists as a blob;
+        paths that are missing or too large to be returned are left out.
+        Needs a GitHub token. Expects distinct paths.
+        """
+        if not self.github_token or not self.owner or not self.repo:
+            return {}
+
+        ref = self.branch or "HEAD"
+        found: Dict[str, str] = {}
+        client = await self._get_client()
+
+        async def fetch_batch(batch: List[str]) -> None:
+            # Paths are passed as variables so they never need escaping
+            params = "".join(f", $p{i}: String!" for i in range(len(batch)))
+            fields = " ".join(
+                f"f{i}: object(expression: $p{i}) {{ ... on Blob {{ text isBinary isTruncated }} }}"
+                for i in range(len(batch))
+            )
+            variables = {"owner": self.owner, "name": self.repo}
+            for i, path in enumerate(batch):
+                variables[f"p{i}"] = f"{ref}:{path}"
+
+            response = await client.post(
+                "https://api.github.com/graphql",
+                json={
+                    "query": f"query($owner: String!, $name: String!{params}) {{ repository(owner: $owner, name: $name) {{ {fields} }} }}",
+                    "variables": variables,
+                },
+            )
+            if response.status_code != 200:
+                return
+            repository = (response.json().get("data") or {}).get("repository") or {}
+            for i, path in enumerate(batch):
+                blob = repository.get(f"f{i}")
+                if not blob or blob.get("isTruncated"):
+                    continue
+                if blob.get("isBinary"):
+                    found[path] = "[Binary file - cannot display content]"
+                elif blob.get("text") is not None:
+                    found[path] = blob["text"]
+
+        async with asyncio.TaskGroup() as tg:
+            for start in range(0, len(file_paths), _GRAPHQL_BATCH_SIZE):
+                tg.create_task(fetch_batch(file_paths[start : start + _GRAPHQL_BATCH_SIZE]))
+        return found
+
+    async def fetch_files_concurrent(self, file_paths: List[str]) -> Dict[str, str]:
+        """Fetch files by exact path from the contents API, up to 10 at a time.
+
+        Works without a GitHub token. Returns the content of each path that
+        exists as a file; other paths are left out. Expects distinct paths.
+        """
+        if not self.owner or not self.repo:
+            return {}
+
+        found: Dict[str, str] = {}
+        client = await self._get_client()
+        sem = asyncio.Semaphore(_MAX_CONCURRENT_FETCHES)
+
+        async def fetch_one(path: str) -> None:
+            async with sem:
+                # Stop spending requests once GitHub reports the limit exhausted
+                if is_rate_limited():
+                    return
+                response = await client.get(
+                    f"https://api.github.com/repos/{self.owner}/{self.repo}/contents/{quote(path)}",
+                    params={"ref": self.branch} if self.branch else {},
+                    headers={"Accept": _RAW_MEDIA_TYPE},
+                )
+            # Directories come back as a JSON listing even with the raw media type
+            if response.status_code != 200 or response.headers.get(
+                "Content-Type", ""
+            ).startswith("application/json"):
+                return
+            try:
+                found[path] = response.content.decode("utf-8")
+            except UnicodeDecodeError:
+                found[path] = "[Binary file - cannot display content]"
+
+        async with asyncio.TaskGroup() as tg:
+            for path in file_paths:
+                tg.create_task(fetch_one(path))
+        return found
+
+    async def _get_repo_metadata(self) -> Dict[str, Any]:
+        """Get repository metadata from GitHub API, empty if unavailable."""
+        repo_data = await self._get_api_json(
+            ("repo", self.owner, self.repo),
+            f"https://api.github.com/repos/{self.owner}/{self.repo}",
+        )
+        return repo_data or {}
+
     async def _check_if_private_repo(self) -> bool:
         """Check if repository is private using GitHub API."""
         if not self.owner or not self.repo or not self.github_token:
             return False
 
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"token {self.github_token}",
-                    "Accept": "application/vnd.github.v3+json",
-                }
-                response = await client.get(
-                    f"https://api.github.com/repos/{self.owner}/{self.repo}",
-                    headers=headers,
-                )
-                if response.status_code == 200:
-                    repo_data = response.json()
-                    return repo_data.get("private", False)
-                return False
+            repo_data = await self._get_repo_metadata()
+            return repo_data.get("private", False)
         except Exception:
             return False
 
     async def fetch_repo_data(self) -> None:
         """Asynchronously fetch and process repository data."""
+        if self.partial_paths is not None:
+            await self._load_tree(self.branch or "HEAD")
+            self.partial_files = await self._fetch_files_via_api(self.partial_paths)
+            return
+
+        from gitingest import ingest
+
         self.is_private_repo = await self._check_if_private_repo()
 
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             summary, self.tree, self.content = await loop.run_in_executor(
-                None, lambda: ingest(self.url)
+                _INGEST_POOL, ingest, self.url
             )
             self.summary = self._parse_summary(summary)
         except Exception as e:
@@ -72,89 +422,83 @@ class GitIngester:
     async def _fetch_via_github_api(self) -> None:
         """Fetch repository data using GitHub API for private repositories."""
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"token {self.github_token}",
-                    "Accept": "application/vnd.github.v3+json",
-                }
-
-                repo_response = await client.get(
-                    f"https://api.github.com/repos/{self.owner}/{self.repo}",
-                    headers=headers,
-                )
-                repo_data = repo_response.json()
+            repo_data = await self._get_repo_metadata()
 
-                branch_name = self.branch or repo_data.get("default_branch", "main")
-                tree_response = await client.get(
-                    f"https://api.github.com/repos/{self.owner}/{self.repo}/git/trees/{branch_name}?recursive=1",
-                    headers=headers,
-                )
-                tree_data = tree_response.json()
-
-                file_count = len(
-                    [
-                        item
-                        for item in tree_data.get("tree", [])
-                        if item["type"] == "blob"
-                    ]
-                )
-                summary_str = f"Repository: {self.owner}/{self.repo}\nFiles analyzed: {file_count}\nEstimated tokens: Unknown (private repo via API)"
+            branch_name = self.branch or repo_data.get("default_branch", "main")
+            blob_shas = await self._get_api_json(
+                ("tree", self.owner, self.repo, branch_name),
+                f"https://api.github.com/repos/{self.owner}/{self.repo}/git/trees/{branch_name}?recursive=1",
+                transform=self._project_tree,
+            )
+            blob_shas = blob_shas or {}
+            blob_paths = list(blob_shas)
+            self._set_tree(blob_shas)
 
-                tree_structure = self._build_tree_structure(tree_data.get("tree", []))
+            file_count = len(blob_paths)
+            summary_str = f"Repository: {self.owner}/{self.repo}\nFiles analyzed: {file_count}\nEstimated tokens: Unknown (private repo via API)"
 
-                self.summary = self._parse_summary(summary_str)
-                self.tree = tree_structure
-                self.content = "Content available via GitHub API - use git_files to fetch specific files"
-                self._tree_data = tree_data.get("tree", [])
+            tree_structure = self._build_tree_structure(blob_paths)
+
+            self.summary = self._parse_summary(summary_str)
+            self.tree = tree_structure
+            self.content = "Content available via GitHub API - use git_files to fetch specific files"
 
         except Exception as e:
             raise Exception(
                 f"Failed to fetch private repository via GitHub API: {str(e)}"
             )
 
-    def _build_tree_structure(self, tree_items: List[Dict]) -> str:
-        """Build a tree structure string from GitHub API tree data."""
-        tree_lines = []
-        for item in sorted(tree_items, key=lambda x: x["path"]):
-            if item["type"] == "blob":
-                path_parts = item["path"].split("/")
-                if (
-                    not any(part.startswith(".") for part in path_parts)
-                    and "components/ui" not in item["path"]
-                ):
-                    tree_lines.append(item["path"])
-        return "\n".join(tree_lines)
+    async def _load_tree(self, ref: str) -> None:
+        """Load the recursive tree at ref, raising if it is unavailable."""
+        blob_shas = await self._get_api_json(
+            ("tree", self.owner, self.repo, ref),
+            f"https://api.github.com/repos/{self.owner}/{self.repo}/git/trees/{ref}?recursive=1",
+            transform=self._project_tree,
+        )
+        if blob_shas is None:
+            raise Exception(f"Failed to fetch repository tree for '{ref}'")
+        self._set_tree(blob_shas)
+
+    def _set_tree(self, blob_shas: Dict[str, str]) -> None:
+        """Store the blob path -> SHA map and index it for path lookups."""
+        self._tree_data = list(blob_shas)
+        self._sha_by_path = blob_shas
+        self._index_tree()
+
+    @staticmethod
+    def _project_tree(tree_data: Dict[str, Any]) -> Dict[str, str]:
+        """Reduce a recursive tree API response to blob path -> SHA, in tree order."""
+        return {
+            item["path"]: item["sha"]
+            for item in tree_data.get("tree", [])
+            if item["type"] == "blob"
+        }
+
+    def _build_tree_structure(self, blob_paths: List[str]) -> str:
+        """Build a tree structure string from the repository's blob paths."""
+        # "/." in "/" + path is true when any path component is hidden
+        return "\n".join(
+            path
+            for path in sorted(blob_paths)
+            if "/." not in "/" + path and "components/ui" not in path
+        )
 
     def _parse_summary(self, summary_str: str) -> Dict[str, Any]:
         """Parse the summary string into a structured dictionary."""
-        summary_dict = {}
-
-        try:
-            repo_match = re.search(r"Repository: (.+)", summary_str)
-            if repo_match:
-                summary_dict["repository"] = repo_match.group(1).strip()
-            else:
-                summary_dict["repository"] = ""
-
-            files_match = re.search(r"Files analyzed: (\d+)", summary_str)
-            if files_match:
-                summary_dict["num_files"] = int(files_match.group(1))
-            else:
-                summary_dict["num_files"] = None
-
-            tokens_match = re.search(r"Estimated tokens: (.+)", summary_str)
-            if tokens_match:
-                summary_dict["token_count"] = tokens_match.group(1).strip()
-            else:
-                summary_dict["token_count"] = ""
-
-        except Exception:
-            summary_dict["repository"] = ""
-            summary_dict["num_files"] = None
-            summary_dict["token_count"] = ""
-
-        summary_dict["raw"] = summary_str
-        return summary_dict
+        # Each field sits on its own "Label: value" line
+        fields: Dict[str, str] = {}
+        for line in summary_str.split("\n"):
+            label, sep, value = line.partition(": ")
+            if sep:
+                fields.setdefault(label.strip(), value.strip())
+
+        num_files = fields.get("Files analyzed", "")
+        return {
+            "repository": fields.get("Repository", ""),
+            "num_files": int(num_files) if num_files.isdecimal() else None,
+            "token_count": fields.get("Estimated tokens", ""),
+            "raw": summary_str,
+        }
 
     def get_summary(self) -> str:
         """Returns the repository summary."""
@@ -170,184 +514,186 @@ class GitIngester:
             return self.content
         return self._get_files_content(file_paths)
 
-    async def _get_files_content_async(self, file_paths: List[str]) -> str:
-        """Async helper function to extract specific files from repository content."""
-        result = {}
-        for path in file_paths:
-            result[path] = None
-
-        if hasattr(self, "_tree_data") and self.github_token:
-            try:
-                return await self._fetch_files_via_api(file_paths)
-            except Exception as e:
-                return f"Error fetching files via GitHub API: {str(e)}"
+    def get_files(self, file_paths: List[str]) -> FileContents:
+        """Returns the requested files found in the repository content."""
+        # Drop duplicate paths, keeping first-seen order
+        file_paths = list(dict.fromkeys(file_paths))
 
         if not self.content:
-            return self._format_empty_result(result)
-        content_str = str(self.content)
+            return FileContents(missing=file_paths)
 
-        return self._get_files_content_sync(file_paths, content_str)
+        return self._get_files_content_sync(file_paths, str(self.content))
+
+    async def _get_files_content_async(self, file_paths: List[str]) -> FileContents:
+        """Async helper function to extract specific files from repository content."""
+        if self.supports_async_files and self._tree_data is not None:
+            return await self._fetch_files_via_api(file_paths)
+
+        return self.get_files(file_paths)
 
     def _get_files_content(self, file_paths: List[str]) -> str:
         """Helper function to extract specific files from repository content (sync version for gitingest content)."""
-        result = {}
-        for path in file_paths:
-            result[path] = None
-
         if not self.content:
-            return self._format_empty_result(result)
+            return self._format_empty_result(dict.fromkeys(file_paths))
 
-        content_str = str(self.content)
-        return self._get_files_content_sync(file_paths, content_str)
+        return self._join_file_sections(self.get_files(file_paths).found)
 
-    def _get_files_content_sync(self, file_paths: List[str], content_str: str) -> str:
+    def _get_files_content_sync(self, file_paths: List[str], content: str) -> FileContents:
         """Synchronous file content extraction from gitingest content."""
         result = {}
         for path in file_paths:
             result[path] = None
 
-        patterns = [
-            r"={50}\nFile: ([^\n]+)\n={50}",
-            r"={10,}\nFile: ([^\n]+)\n={10,}",
-            r"=+\s*File:\s*([^\n]+)\s*\n=+",
-        ]
-
-        for pattern in patterns:
-            matches = re.finditer(pattern, content_str)
-            matched = False
-            for match in matches:
-                matched = True
-                start_pos = match.end()
-                filename = match.group(1).strip()
-                next_match = re.search(pattern, content_str[start_pos:])
-                if next_match:
-                    end_pos = start_pos + next_match.start()
-                    file_content = content_str[start_pos:end_pos].strip()
-                else:
-                    file_content = content_str[start_pos:].strip()
-
-                for path in file_paths:
-                    # Simple and direct matching approach
-                    # 1. Exact match first (most common case)
-                    if path == filename:
-                        result[path] = file_content
-                    # 2. Check if the found file path ends with the requested path
-                    elif filename.endswith("/" + path):
-                        result[path] = file_content
-                    # 3. Fallback to filename matching for edge cases
-                    elif path.split("/")[-1] == filename.split("/")[-1]:
-                        result[path] = file_content
-
-            if matched:
-                break
-
-        concatenated = ""
+        # Collect (header start, body start, filename) in one pass; each body
+        # runs up to the start of the following header. Every header format
+        # contains "File:", and gitingest's own headers are found without
+        # regexes, so the pattern only runs as a fallback.
+        hits: List[Tuple[int, int, str]] = []
+        if "File:" in content:
+            hits = _scan_file_headers(content)
+            if not hits:
+                hits = [
+                    (match.start(), match.end(), match.group(1).strip())
+                    for match in _FILE_HDR_RE.finditer(content)
+                ]
+
+        for idx, (_, start_pos, filename) in enumerate(hits):
+            file_content = None
+
+            for path in file_paths:
+                # Simple and direct matching approach
+                # 1. Exact match first (most common case)
+                # 2. Check if the found file path ends with the requested path
+                # 3. Fallback to filename matching for edge cases
+                if (
+                    path == filename
+                    or filename.endswith("/" + path)
+                    or path.split("/")[-1] == filename.split("/")[-1]
+                ):
+                    # Only matched bodies are sliced out of the content
+                    if file_content is None:
+                        end_pos = hits[idx + 1][0] if idx + 1 < len(hits) else len(content)
+                        file_content = content[start_pos:end_pos].strip()
+                    result[path] = file_content
+
+        return self._split_result(result)
+
+    @staticmethod
+    def _split_result(result: Dict[str, Optional[str]]) -> FileContents:
+        """Split path -> content (None if not found) into a FileContents, keeping order."""
+        files = FileContents()
         for path, content in result.items():
-            if content is not None:
-                if concatenated:
-                    concatenated += "\n\n"
-                concatenated += f"==================================================\nFile: {path}\n==================================================\n{content}"
-        return concatenated
+            if content is None:
+                files.missing.append(path)
+            else:
+                files.found[path] = content
+        return files
+
+    @staticmethod
+    def _join_file_sections(result: Dict[str, Optional[str]]) -> str:
+        """Join found files into one string, each under a "File:" header."""
+        return "\n\n".join(
+            f"{_BAR}\nFile: {path}\n{_BAR}\n{content}"
+            for path, content in result.items()
+            if content is not None
+        )
 
     def _format_empty_result(self, result: Dict[str, Any]) -> str:
         """Format empty result when no content is available."""
-        concatenated = ""
-        for path, content in result.items():
-            if concatenated:
-                concatenated += "\n\n"
-            concatenated += f"==================================================\nFile: {path}\n==================================================\nFile not found or no content available"
-        return concatenated
+        return "\n\n".join(
+            f"{_BAR}\nFile: {path}\n{_BAR}\nFile not found or no content available"
+            for path in result
+        )
 
-    async def _fetch_files_via_api(self, file_paths: List[str]) -> str:
+    async def _fetch_files_via_api(self, file_paths: List[str]) -> FileContents:
         """Fetch specific files via GitHub API for private repositories."""
-        result = {}
-        for path in file_paths:
-            result[path] = None
+        # Keyed in first-seen order, which also drops duplicate paths
+        result: Dict[str, Optional[str]] = dict.fromkeys(file_paths)
+        file_paths = list(result)
+        failed = set()
 
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"token {self.github_token}",
-                    "Accept": "application/vnd.github.v3+json",
-                }
-
-                for file_path in file_paths:
-                    try:
-                        actual_path = self._find_file_in_tree(file_path)
-                        if not actual_path:
-                            result[file_path] = (
-                                f"[File not found in repository tree. Available files can be seen with git_tree tool]"
-                            )
-                            continue
-
+            client = await self._get_client()
+            sem = asyncio.Semaphore(_MAX_CONCURRENT_FETCHES)
+
+            # Paths missing from the tree stay None; ones whose download
+            # fails are recorded in failed
+            async def fetch_one(file_path: str) -> None:
+                try:
+                    actual_path = self._find_file_in_tree(file_path)
+                    if not actual_path:
+                        return
+
+                    # The tree already gives the blob SHA, which skips the
+                    # server-side path lookup and pins the tree's revision.
+                    # Resolved paths always come from the tree, so it is set.
+                    sha = self._sha_by_path[actual_path]
+                    async with sem:
                         response = await client.get(
-                            f"https://api.github.com/repos/{self.owner}/{self.repo}/contents/{actual_path}",
-                            headers=headers,
-                            params={"ref": self.branch} if self.branch else {},
+                            f"https://api.github.com/repos/{self.owner}/{self.repo}/git/blobs/{sha}",
+                            headers={"Accept": _RAW_MEDIA_TYPE},
                         )
 
-                        if response.status_code == 200:
-                            file_data = response.json()
-                            if file_data.get("type") == "file":
-                                import base64
-
-                                try:
-                                    content = base64.b64decode(
-                                        file_data["content"]
-                                    ).decode("utf-8")
-                                    result[file_path] = content
-                                except UnicodeDecodeError:
-                                    result[file_path] = (
-                                        f"[Binary file - cannot display content]"
-                                    )
-                            else:
-                                result[file_path] = (
-                                    f"[Directory or unsupported file type]"
-                                )
-                        else:
+                    if response.status_code == 200:
+                        try:
+                            result[file_path] = response.content.decode("utf-8")
+                        except UnicodeDecodeError:
                             result[file_path] = (
-                                f"[File not found at path '{actual_path}' - HTTP {response.status_code}]"
+                                f"[Binary file - cannot display content]"
                             )
-                    except Exception as e:
-                        result[file_path] = f"[Error fetching file: {str(e)}]"
-                        continue
-
-                concatenated = ""
-                for path, content in result.items():
-                    if content is not None:
-                        if concatenated:
-                            concatenated += "\n\n"
-                        concatenated += f"==================================================\nFile: {path}\n==================================================\n{content}"
-
-                return concatenated
+                    else:
+                        failed.add(file_path)
+                except Exception:
+                    failed.add(file_path)
+
+            # Per-file errors are recorded in failed by fetch_one; anything else
+            # escaping a task cancels the rest of the batch
+            async with asyncio.TaskGroup() as tg:
+                for fp in file_paths:
+                    tg.create_task(fetch_one(fp))
+
+            files = self._split_result(
+                {path: content for path, content in result.items() if path not in failed}
+            )
+            files.failed = [path for path in file_paths if path in failed]
+            return files
 
         except Exception as e:
             raise Exception(f"Failed to fetch files via GitHub API: {str(e)}")
 
     def _find_file_in_tree(self, requested_path: str) -> Optional[str]:
         """Find the actual file path in the repository tree data."""
-        if not hasattr(self, "_tree_data"):
+        if self._tree_data is None:
             return None
 
-        for item in self._tree_data:
-            if item["type"] == "blob" and item["path"] == requested_path:
-                return item["path"]
+        if requested_path in self._sha_by_path:
+            return requested_path
+
+        # Ingesters are cached across tool calls, so remember fuzzy
+        # resolutions rather than repeating the suffix scan
+        if requested_path in self._resolved_paths:
+            return self._resolved_paths[requested_path]
 
         requested_filename = requested_path.split("/")[-1]
-        for item in self._tree_data:
-            if item["type"] == "blob":
-                filename = item["path"].split("/")[-1]
-                if filename == requested_filename:
-                    return item["path"]
-
-        for item in self._tree_data:
-            if item["type"] == "blob":
-                filename = item["path"].split("/")[-1]
-                if filename.lower() == requested_filename.lower():
-                    return item["path"]
-
-        for item in self._tree_data:
-            if item["type"] == "blob" and item["path"].endswith(requested_path):
-                return item["path"]
+        actual_path = self._by_filename.get(requested_filename)
+        if actual_path is None:
+            actual_path = self._by_filename_lower.get(requested_filename.lower())
+        if actual_path is None:
+            actual_path = next(
+                (path for path in self._tree_data if path.endswith(requested_path)),
+                None,
+            )
 
-        return None
+        self._resolved_paths[requested_path] = actual_path
+        return actual_path
+
+    def _index_tree(self) -> None:
+        """Build lookup tables over the blobs in the repository tree data."""
+        self._by_filename = {}
+        self._by_filename_lower = {}
+        self._resolved_paths = {}
+        for path in self._tree_data:
+            filename = path.split("/")[-1]
+            # First match in tree order wins, as with a linear scan
+            self._by_filename.setdefault(filename, path)
+            self._by_filename_lower.setdefault(filename.lower(), path)
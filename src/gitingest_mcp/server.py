@@ -1,8 +1,287 @@
+import os
+import re
+import time
+import asyncio
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp import FastMCP
-from gitingest_mcp.ingest import GitIngester
-from typing import Any, Dict, Union, List, Optional
+from gitingest_mcp.ingest import (
+    FileContents,
+    GitIngester,
+    create_github_client,
+    is_rate_limited,
+)
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Union, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+# GitHub API client shared by every tool call, so connections to
+# api.github.com stay open between calls
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def _get_client() -> "httpx.AsyncClient":
+    """Return the shared GitHub API client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_github_client(os.getenv("GITHUB_TOKEN"), max_connections=32)
+    return _client
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Close the shared GitHub API client when the server shuts down."""
+    try:
+        yield
+    finally:
+        if _client is not None:
+            await _client.aclose()
+
+
+mcp = FastMCP("gitingest-mcp", lifespan=_lifespan)
+
+# Runs of slashes in requested file paths
+_SLASHES_RE = re.compile(r"/{2,}")
+# Characters GitHub allows in user, organization and repository names
+_NAME_RE = re.compile(r"[A-Za-z0-9_.-]+")
+
+# (owner, repo, branch)
+_RepoKey = Tuple[str, str, Optional[str]]
+
+# Fetched ingesters as (validated at, head commit ETag, ingester), least
+# recently used first, so back-to-back tool calls on one repository share a
+# single ingest. Expired entries are revalidated against the ETag and only
+# re-ingested when the branch has moved.
+_INGESTER_CACHE: "OrderedDict[_RepoKey, Tuple[float, Optional[str], GitIngester]]" = (
+    OrderedDict()
+)
+_INGESTER_CACHE_TTL = 600.0
+_INGESTER_CACHE_MAX_ENTRIES = 128
+# Fetches in progress, so concurrent calls for one key share a single fetch
+_inflight: Dict[_RepoKey, "asyncio.Task[GitIngester]"] = {}
+
+# git_summary output (summary plus README) per cached ingester; entries go
+# away with the ingester, so a re-ingest never serves a stale summary
+_SUMMARIES: "weakref.WeakKeyDictionary[GitIngester, str]" = weakref.WeakKeyDictionary()
+
+
+def _parse_batch_window(value: Optional[str], default_ms: int = 20) -> float:
+    """Parse a batch window in milliseconds to seconds, falling back to the default."""
+    try:
+        window_ms = int(value) if value and value.strip() else default_ms
+    except ValueError:
+        window_ms = default_ms
+    return max(window_ms, 0) / 1000
+
+
+# How long git_files waits to coalesce exact-path fetches for one repository
+# into a single upstream request
+_BATCH_WINDOW = _parse_batch_window(os.getenv("GITINGEST_BATCH_WINDOW_MS"))
+# Paths collected for the next exact-path fetch per repository (a dict used
+# as an ordered set), and the task that fetches them once the window closes
+_pending: Dict[
+    _RepoKey, Tuple[Dict[str, None], "asyncio.Task[Optional[Dict[str, str]]]"]
+] = {}
+
+# Error messages that never vary
+_NO_PATHS_ERROR = "No file paths provided. Please specify at least one file path (e.g., 'backend/README.md' or 'README.md,src/main.py')."
+_NO_VALID_PATHS_ERROR = "No valid file paths found. Please specify at least one file path (e.g., 'backend/README.md' or 'README.md,src/main.py')."
+_NO_FILES_FOUND_ERROR = "None of the requested files were found in the repository"
+_FAILED_TEMPLATE = "Failed to get {}: {}. Try https://gitingest.com/{} instead"
+
+# Recent "not found" results as (recorded at, error response), keyed by
+# tool and inputs, so a retry of the same bad call is answered without
+# fetching again. Only deterministic outcomes go here; transient failures
+# such as timeouts or rate limits are returned uncached.
+_ERROR_CACHE: Dict[Tuple, Tuple[float, Dict[str, str]]] = {}
+_ERROR_CACHE_TTL = 60.0
+_ERROR_CACHE_MAX_ENTRIES = 512
+
+
+def _cached_ingester(key: _RepoKey) -> Optional[GitIngester]:
+    """Return the cached ingester for key if it is still fresh, else None."""
+    hit = _INGESTER_CACHE.get(key)
+    if hit and time.monotonic() - hit[0] < _INGESTER_CACHE_TTL:
+        _INGESTER_CACHE.move_to_end(key)
+        return hit[2]
+    return None
+
+
+async def _get_ingester(owner: str, repo: str, branch: Optional[str]) -> GitIngester:
+    """Return a fetched GitIngester for the repository, reusing a cached one if current."""
+    key = (owner, repo, branch)
+    ingester = _cached_ingester(key)
+    if ingester is not None:
+        return ingester
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_load_ingester(key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one caller giving up does not cancel the fetch for the others
+    return await asyncio.shield(task)
+
+
+async def _load_ingester(key: _RepoKey) -> GitIngester:
+    """Revalidate the cached ingester for key, or fetch and cache a new one."""
+    owner, repo, branch = key
+    hit = _INGESTER_CACHE.get(key)
+    if hit:
+        validated_at, etag, ingester = hit
+        if etag and await ingester.get_head_etag(etag) == etag:
+            # 304 Not Modified: the branch head is unchanged
+            _INGESTER_CACHE[key] = (time.monotonic(), etag, ingester)
+            _INGESTER_CACHE.move_to_end(key)
+            return ingester
+
+    ingester = GitIngester(
+        f"https://github.com/{owner}/{repo}", branch=branch, client=_get_client()
+    )
+    # Requested alongside the ingest rather than after it, so a push during
+    # the fetch is picked up by the next revalidation
+    try:
+        async with asyncio.TaskGroup() as tg:
+            etag_task = tg.create_task(ingester.get_head_etag())
+            tg.create_task(ingester.fetch_repo_data())
+    except* Exception as eg:
+        # Callers report the ingest error itself, not the group
+        raise eg.exceptions[0]
+    etag = etag_task.result()
+
+    _INGESTER_CACHE[key] = (time.monotonic(), etag, ingester)
+    _INGESTER_CACHE.move_to_end(key)
+    while len(_INGESTER_CACHE) > _INGESTER_CACHE_MAX_ENTRIES:
+        _INGESTER_CACHE.popitem(last=False)
+    return ingester
+
+
+def _cached_error(key: Tuple) -> Optional[Dict[str, str]]:
+    """Return the error recorded for key if it has not expired."""
+    hit = _ERROR_CACHE.get(key)
+    if hit and time.monotonic() - hit[0] < _ERROR_CACHE_TTL:
+        # A copy, so a caller mutating its response can't alter later ones
+        return dict(hit[1])
+    return None
+
+
+def _remember_error(key: Tuple, error: Dict[str, str]) -> Dict[str, str]:
+    """Record error for key and return it."""
+    _ERROR_CACHE.pop(key, None)
+    if len(_ERROR_CACHE) >= _ERROR_CACHE_MAX_ENTRIES:
+        # Evict the oldest entry, expired ones first
+        now = time.monotonic()
+        for stale in [k for k, (t, _) in _ERROR_CACHE.items() if now - t >= _ERROR_CACHE_TTL]:
+            del _ERROR_CACHE[stale]
+        if len(_ERROR_CACHE) >= _ERROR_CACHE_MAX_ENTRIES:
+            del _ERROR_CACHE[next(iter(_ERROR_CACHE))]
+    _ERROR_CACHE[key] = (time.monotonic(), error)
+    return error
+
+
+def _failure(what: str, detail: str, url: str) -> Dict[str, str]:
+    """Return the error response for a failed fetch."""
+    return {"error": _FAILED_TEMPLATE.format(what, detail, url)}
+
+
+def _invalid_repo(owner: str, repo: str) -> Optional[Dict[str, str]]:
+    """Return an error if owner or repo cannot name a GitHub repository, else None."""
+    for name in (owner, repo):
+        if not name or not _NAME_RE.fullmatch(name) or name in (".", ".."):
+            return {
+                "error": f"Invalid repository '{owner}/{repo}'. Owner and repository names may only contain letters, digits, '-', '_' and '.'."
+            }
+    return None
+
+
+def _normalize_path(path: str) -> str:
+    """Strip whitespace and leading "./", and collapse repeated slashes."""
+    path = path.strip()
+    while path.startswith("./"):
+        path = path[2:]
+    return _SLASHES_RE.sub("/", path)
+
+
+async def _fetch_readme_direct(owner: str, repo: str, branch: Optional[str]) -> Optional[str]:
+    """Fetch the formatted README.md section without waiting for an ingest."""
+    ingester = GitIngester(
+        f"https://github.com/{owner}/{repo}", branch=branch, client=_get_client()
+    )
+    return await ingester.fetch_readme()
+
+
+async def _fetch_files_direct(
+    owner: str, repo: str, branch: Optional[str], file_paths: List[str]
+) -> Optional[FileContents]:
+    """Fetch files by exact path without ingesting the repository.
+
+    Calls for the same repository within _BATCH_WINDOW share one fetch.
+    Returns None if the lookup itself failed or the rate limit is exhausted.
+    """
+    if is_rate_limited():
+        return None
+
+    key = (owner, repo, branch)
+    pending = _pending.get(key)
+    if pending is None:
+        pending = ({}, asyncio.create_task(_run_files_batch(key)))
+        _pending[key] = pending
+    pending[0].update(dict.fromkeys(file_paths))
+
+    # Shielded so one caller giving up does not cancel the batch for the others
+    found = await asyncio.shield(pending[1])
+    if found is None:
+        return None
+    return FileContents(
+        found={path: found[path] for path in file_paths if path in found},
+        missing=[path for path in file_paths if path not in found],
+    )
+
+
+async def _fetch_files_partial(
+    owner: str, repo: str, branch: Optional[str], file_paths: List[str]
+) -> Optional[FileContents]:
+    """Resolve paths against the repository tree and fetch only those blobs.
+
+    Returns None if the tree or files could not be fetched, or the rate limit
+    is exhausted.
+    """
+    if is_rate_limited():
+        return None
+
+    ingester = GitIngester(
+        f"https://github.com/{owner}/{repo}",
+        branch=branch,
+        client=_get_client(),
+        partial_paths=file_paths,
+    )
+    try:
+        await ingester.fetch_repo_data()
+    except Exception:
+        return None
+    return ingester.partial_files
+
+
+async def _run_files_batch(key: _RepoKey) -> Optional[Dict[str, str]]:
+    """Fetch every path collected for key once the batching window closes."""
+    await asyncio.sleep(_BATCH_WINDOW)
+    paths, _ = _pending.pop(key)
+    file_paths = list(paths)
+
+    owner, repo, branch = key
+    ingester = GitIngester(
+        f"https://github.com/{owner}/{repo}", branch=branch, client=_get_client()
+    )
+    try:
+        # GraphQL batches every path into one request but needs a token
+        if ingester.github_token:
+            return await ingester.fetch_files_graphql(file_paths)
+        return await ingester.fetch_files_concurrent(file_paths)
+    except Exception:
+        return None
 
-mcp = FastMCP("gitingest-mcp")
 
 @mcp.tool()
 async def git_summary(
@@ -22,26 +301,49 @@ async def git_summary(
             repo: The repository name
             branch: Optional branch name (default: None)
     """
+    invalid = _invalid_repo(owner, repo)
+    if invalid is not None:
+        return invalid
+
     url = f"https://github.com/{owner}/{repo}"
 
+    # A fresh ingest with its summary already composed needs no README fetch
+    ingester = _cached_ingester((owner, repo, branch))
+    if ingester is not None and ingester in _SUMMARIES:
+        return _SUMMARIES[ingester]
+
     try:
-        ingester = GitIngester(url, branch=branch)
-        await ingester.fetch_repo_data()
+        # The README comes straight from the contents API, so it downloads
+        # while the repository is being ingested. If either fails, the other
+        # is cancelled rather than left running.
+        async with asyncio.TaskGroup() as tg:
+            ingester_task = tg.create_task(_get_ingester(owner, repo, branch))
+            readme_task = tg.create_task(_fetch_readme_direct(owner, repo, branch))
+        ingester = ingester_task.result()
+        # None if the fetch failed, "" if there is no top-level README.md
+        readme_content = readme_task.result()
         summary = ingester.get_summary()
 
         try:
-            readme_content = ingester.get_content(["README.md"])
-            if readme_content and "README.md" in readme_content:
-                summary = f"{summary}\n\n{readme_content}"
+            if not readme_content:
+                readme = ingester.get_files(["README.md"]).found
+                if readme:
+                    readme_content = GitIngester._join_file_sections(readme)
+            if readme_content:
+                summary = "".join((summary, "\n\n", readme_content))
         except Exception:
             pass
 
+        # A README that failed to download may be there next time
+        if readme_content is not None:
+            _SUMMARIES[ingester] = summary
         return summary
 
-    except Exception as e:
-        return {
-            "error": f"Failed to get repository summary: {str(e)}. Try https://gitingest.com/{url} instead"
-        }
+    except* Exception as eg:
+        # return is not allowed inside except*
+        e = eg.exceptions[0]
+
+    return _failure("repository summary", str(e), url)
 
 @mcp.tool()
 async def git_tree(
@@ -57,16 +359,16 @@ async def git_tree(
             repo: The repository name
             branch: Optional branch name (default: None)
     """
-    url = f"https://github.com/{owner}/{repo}"
+    invalid = _invalid_repo(owner, repo)
+    if invalid is not None:
+        return invalid
 
+    url = f"https://github.com/{owner}/{repo}"
     try:
-        ingester = GitIngester(url, branch=branch)
-        await ingester.fetch_repo_data()
+        ingester = await _get_ingester(owner, repo, branch)
         return ingester.get_tree()
     except Exception as e:
-        return {
-            "error": f"Failed to get repository tree: {str(e)}. Try https://gitingest.com/{url} instead"
-        }
+        return _failure("repository tree", str(e), url)
 
 
 @mcp.tool()
@@ -85,46 +387,77 @@ async def git_files(
             file_paths: Comma-separated list of file paths (e.g., "README.md,src/main.py" or "backend/README.md")
             branch: Optional branch name (default: None)
     """
+    invalid = _invalid_repo(owner, repo)
+    if invalid is not None:
+        return invalid
+
     url = f"https://github.com/{owner}/{repo}"
 
     # Parse comma-separated file paths into a list
     if not file_paths or not file_paths.strip():
-        return {
-            "error": "No file paths provided. Please specify at least one file path (e.g., 'backend/README.md' or 'README.md,src/main.py')."
-        }
+        return {"error": _NO_PATHS_ERROR}
 
-    # Split by comma and clean up whitespace
-    file_paths_list = [path.strip() for path in file_paths.split(",") if path.strip()]
+    # Split by comma, normalize, and drop duplicates keeping first-seen order
+    file_paths_list = list(
+        dict.fromkeys(
+            path for path in map(_normalize_path, file_paths.split(",")) if path
+        )
+    )
 
     if not file_paths_list:
-        return {
-            "error": "No valid file paths found. Please specify at least one file path (e.g., 'backend/README.md' or 'README.md,src/main.py')."
-        }
+        return {"error": _NO_VALID_PATHS_ERROR}
+
+    error_key = ("files", owner, repo, branch, frozenset(file_paths_list))
+    cached = _cached_error(error_key)
+    if cached is not None:
+        return cached
 
     try:
-        ingester = GitIngester(url, branch=branch)
-        await ingester.fetch_repo_data()
+        files = FileContents(missing=file_paths_list)
 
-        if hasattr(ingester, "_tree_data") and ingester.github_token:
-            files_content = await ingester._get_files_content_async(file_paths_list)
-        else:
-            files_content = ingester.get_content(file_paths_list)
-
-        # Check if any actual file content was found (not just error messages)
-        if (
-            not files_content
-            or "File not found" in files_content
-            or "[File not found" in files_content
-        ):
-            return {
-                "error": f"None of the requested files were found in the repository"
-            }
+        # A cached ingest answers without any requests. Otherwise exact paths
+        # are fetched directly, anything unresolved is matched fuzzily
+        # against the tree (one call plus one per file), and the repository
+        # is only ingested in full if that fails.
+        if _cached_ingester((owner, repo, branch)) is None:
+            direct = await _fetch_files_direct(owner, repo, branch, file_paths_list)
+            if direct is not None:
+                files = direct
+
+            if files.missing:
+                partial = await _fetch_files_partial(owner, repo, branch, files.missing)
+                if partial is not None:
+                    # Paths the tree does not resolve are not in the repository;
+                    # ones that failed to download are retried below
+                    files.found.update(partial.found)
+                    files.missing = partial.failed
+
+        if files.missing:
+            ingester = await _get_ingester(owner, repo, branch)
+
+            fallback = await ingester._get_files_content_async(files.missing)
+            files.found.update(fallback.found)
+            files.failed = fallback.failed
+
+        if not files.found:
+            if files.failed:
+                # Download failures may be transient, so they are not cached
+                return _failure(
+                    "file content", f"could not download {', '.join(files.failed)}", url
+                )
+            return _remember_error(error_key, {"error": _NO_FILES_FOUND_ERROR})
+        files_content = GitIngester._join_file_sections(
+            {path: files.found[path] for path in file_paths_list if path in files.found}
+        )
+        # Name the paths that were left out, so a typo isn't mistaken for an
+        # empty result
+        missing = [path for path in file_paths_list if path not in files.found]
+        if missing:
+            files_content = "".join((files_content, "\n\nNot found: ", ", ".join(missing)))
         return files_content
 
     except Exception as e:
-        return {
-            "error": f"Failed to get file content: {str(e)}. Try https://gitingest.com/{url} instead"
-        }
+        return _failure("file content", str(e), url)
 
 
 def main():
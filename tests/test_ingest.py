@@ -0,0 +1,147 @@
+import unittest
+
+from gitingest_mcp import ingest
+from gitingest_mcp.ingest import GitIngester
+
+
+def _section(path, body, bar="=" * 48):
+    return f"{bar}\nFile: {path}\n{bar}\n{body}\n\n"
+
+
+class TestGetFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.ingester = GitIngester("https://github.com/o/r")
+
+    def test_bodies_are_stripped_of_unicode_whitespace(self):
+        self.ingester.content = _section("a.py", "　héllo\xa0") + _section("b.py", "B")
+
+        files = self.ingester.get_files(["a.py"])
+
+        self.assertEqual(files.found, {"a.py": "héllo"})
+        self.assertEqual(files.missing, [])
+
+    def test_duplicate_paths_are_looked_up_once(self):
+        self.ingester.content = _section("a.py", "A")
+
+        files = self.ingester.get_files(["a.py", "nope.py", "a.py", "nope.py"])
+
+        self.assertEqual(files.found, {"a.py": "A"})
+        self.assertEqual(files.missing, ["nope.py"])
+
+
+class TestScanFileHeaders(unittest.TestCase):
+
+    def test_finds_48_and_50_char_bars(self):
+        content = _section("a.py", "A") + _section("b.py", "B", bar="=" * 50)
+
+        hits = ingest._scan_file_headers(content)
+
+        self.assertEqual([filename for _, _, filename in hits], ["a.py", "b.py"])
+        self.assertEqual(hits[0][0], 0)
+        self.assertEqual(content[hits[0][1] :].lstrip("\n")[:1], "A")
+
+    def test_file_line_inside_a_body_is_not_a_header(self):
+        content = _section("a.py", "x = 1\nFile: fake.py\ny = 2") + _section("b.py", "B")
+
+        hits = ingest._scan_file_headers(content)
+
+        self.assertEqual([filename for _, _, filename in hits], ["a.py", "b.py"])
+
+    def test_short_bars_are_rejected(self):
+        self.assertEqual(ingest._scan_file_headers(_section("a.py", "A", bar="=====")), [])
+
+    def test_last_file_runs_to_end_of_content(self):
+        ingester = GitIngester("https://github.com/o/r")
+        ingester.content = _section("a.py", "A") + _section("b.py", "line 1\nline 2")
+
+        files = ingester.get_files(["b.py", "a.py"])
+
+        self.assertEqual(files.found, {"a.py": "A", "b.py": "line 1\nline 2"})
+
+
+class TestHeaderRegexFallback(unittest.TestCase):
+
+    def test_short_bar_headers_are_found_by_the_regex(self):
+        ingester = GitIngester("https://github.com/o/r")
+        ingester.content = _section("a.py", "A", bar="=====") + _section(
+            "src/b.py", "B", bar="====="
+        )
+
+        files = ingester.get_files(["a.py", "b.py"])
+
+        self.assertEqual(files.found, {"a.py": "A", "b.py": "B"})
+
+
+class TestBuildTreeStructure(unittest.TestCase):
+
+    def test_hidden_and_ui_component_paths_are_filtered(self):
+        ingester = GitIngester("https://github.com/o/r")
+
+        tree = ingester._build_tree_structure(
+            [
+                "src/main.py",
+                ".github/workflows/ci.yml",
+                "src/.env",
+                "web/components/ui/button.tsx",
+                "README.md",
+                "docs/a.b/c.md",
+            ]
+        )
+
+        self.assertEqual(tree, "README.md\ndocs/a.b/c.md\nsrc/main.py")
+
+
+class TestParseSummary(unittest.TestCase):
+
+    def test_fields_are_parsed_from_label_lines(self):
+        ingester = GitIngester("https://github.com/o/r")
+        raw = "Repository: o/r\nFiles analyzed: 12\n\nEstimated tokens: 3.4k"
+
+        summary = ingester._parse_summary(raw)
+
+        self.assertEqual(
+            summary,
+            {"repository": "o/r", "num_files": 12, "token_count": "3.4k", "raw": raw},
+        )
+
+    def test_missing_or_non_numeric_fields(self):
+        ingester = GitIngester("https://github.com/o/r")
+
+        summary = ingester._parse_summary("Repository: o/r\nFiles analyzed: many")
+
+        self.assertEqual(summary["num_files"], None)
+        self.assertEqual(summary["token_count"], "")
+
+
+class TestFindFileInTree(unittest.TestCase):
+
+    def setUp(self):
+        self.ingester = GitIngester("https://github.com/o/r")
+        self.ingester._set_tree(
+            {
+                "lib/util.py": "s1",
+                "src/util.py": "s2",
+                "docs/Guide.MD": "s3",
+            }
+        )
+
+    def test_exact_path_wins(self):
+        self.assertEqual(self.ingester._find_file_in_tree("src/util.py"), "src/util.py")
+
+    def test_filename_matches_first_path_in_tree_order(self):
+        self.assertEqual(self.ingester._find_file_in_tree("other/util.py"), "lib/util.py")
+
+    def test_filename_falls_back_to_case_insensitive_match(self):
+        self.assertEqual(self.ingester._find_file_in_tree("guide.md"), "docs/Guide.MD")
+
+    def test_suffix_match_is_the_last_resort(self):
+        self.assertEqual(self.ingester._find_file_in_tree("ide.MD"), "docs/Guide.MD")
+        self.assertIsNone(self.ingester._find_file_in_tree("missing.py"))
+
+    def test_no_tree_resolves_nothing(self):
+        self.assertIsNone(GitIngester("https://github.com/o/r")._find_file_in_tree("a.py"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,296 @@
+import asyncio
+import json
+import os
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+from gitingest_mcp import ingest, server
+
+_BAR = "=" * 48
+
+
+class FakeGitHub:
+    """GitHub API stand-in for httpx.MockTransport that records every request."""
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+        self.head_etag = '"head-1"'
+        self.blob_status = 200
+        self.rate_limited = False
+        self.ingests = 0
+
+    def paths(self):
+        return [request.url.path for request in self.requests]
+
+    def handle(self, request):
+        self.requests.append(request)
+        path = request.url.path
+        prefix = "/repos/o/r/"
+
+        if self.rate_limited:
+            return httpx.Response(
+                403,
+                headers={
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(int(time.time()) + 3600),
+                },
+            )
+
+        if path == "/graphql":
+            variables = json.loads(request.content)["variables"]
+            repository = {}
+            for name, expression in variables.items():
+                if name.startswith("p"):
+                    content = self.files.get(expression.split(":", 1)[1])
+                    if content is not None:
+                        repository[f"f{name[1:]}"] = {
+                            "text": content,
+                            "isBinary": False,
+                            "isTruncated": False,
+                        }
+            return httpx.Response(200, json={"data": {"repository": repository}})
+
+        if path.startswith(prefix + "commits/"):
+            if request.headers.get("If-None-Match") == self.head_etag:
+                return httpx.Response(304)
+            return httpx.Response(200, text="sha", headers={"ETag": self.head_etag})
+
+        if path.startswith(prefix + "git/trees/"):
+            tree = [{"path": p, "type": "blob", "sha": "sha-" + p} for p in self.files]
+            return httpx.Response(200, json={"tree": tree})
+
+        if path.startswith(prefix + "git/blobs/sha-"):
+            if self.blob_status != 200:
+                return httpx.Response(self.blob_status)
+            return httpx.Response(200, text=self.files[path[len(prefix + "git/blobs/sha-"):]])
+
+        if path.startswith(prefix + "contents/"):
+            content = self.files.get(path[len(prefix + "contents/"):])
+            if content is None:
+                return httpx.Response(404)
+            return httpx.Response(200, text=content)
+
+        return httpx.Response(404)
+
+    def ingest(self, url):
+        """Replacement for gitingest.ingest that builds output from self.files."""
+        self.ingests += 1
+        content = "".join(
+            f"{_BAR}\nFile: {path}\n{_BAR}\n{text}\n\n" for path, text in self.files.items()
+        )
+        return "Repository: o/r\nFiles analyzed: 2", "\n".join(self.files), content
+
+
+class ServerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    token = None
+
+    async def asyncSetUp(self):
+        self.github = FakeGitHub({"README.md": "# Title", "src/a.py": "A = 1"})
+        server._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(self.github.handle),
+            event_hooks={"response": [ingest._record_rate_limit]},
+        )
+        ingest._rate_limited_until = 0.0
+
+        for state in (
+            server._INGESTER_CACHE,
+            server._inflight,
+            server._pending,
+            server._ERROR_CACHE,
+            ingest._API_CACHE,
+        ):
+            state.clear()
+
+        env = {"GITHUB_TOKEN": self.token} if self.token else {}
+        patches = [
+            mock.patch.dict(os.environ, env, clear=True),
+            mock.patch("gitingest.ingest", self.github.ingest),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def asyncTearDown(self):
+        await server._client.aclose()
+
+
+class TestCaching(ServerTestCase):
+
+    async def test_warm_cache_hit_sends_no_requests(self):
+        await server.git_tree("o", "r")
+        self.github.requests.clear()
+
+        tree = await server.git_tree("o", "r")
+        files = await server.git_files("o", "r", "a.py")
+
+        self.assertEqual(tree, "README.md\nsrc/a.py")
+        self.assertIn("A = 1", files)
+        self.assertEqual(self.github.requests, [])
+        self.assertEqual(self.github.ingests, 1)
+
+    async def test_concurrent_calls_share_one_ingest(self):
+        results = await asyncio.gather(*(server.git_tree("o", "r") for _ in range(5)))
+
+        self.assertEqual(set(results), {"README.md\nsrc/a.py"})
+        self.assertEqual(self.github.ingests, 1)
+        self.assertEqual(self.github.paths(), ["/repos/o/r/commits/HEAD"])
+
+    async def test_expired_entry_is_revalidated_with_304(self):
+        await server.git_tree("o", "r")
+        key = ("o", "r", None)
+        _, etag, ingester = server._INGESTER_CACHE[key]
+        server._INGESTER_CACHE[key] = (0.0, etag, ingester)
+        self.github.requests.clear()
+
+        await server.git_tree("o", "r")
+
+        self.assertEqual(self.github.ingests, 1)
+        self.assertEqual(self.github.paths(), ["/repos/o/r/commits/HEAD"])
+        self.assertEqual(self.github.requests[0].headers["If-None-Match"], '"head-1"')
+
+        server._INGESTER_CACHE[key] = (0.0, etag, ingester)
+        self.github.head_etag = '"head-2"'
+        await server.git_tree("o", "r")
+
+        self.assertEqual(self.github.ingests, 2)
+        self.assertEqual(server._INGESTER_CACHE[key][1], '"head-2"')
+
+    async def test_ingest_error_is_reported_unwrapped(self):
+        with mock.patch("gitingest.ingest", side_effect=RuntimeError("boom")):
+            result = await server.git_tree("o", "r")
+
+        self.assertEqual(
+            result,
+            {
+                "error": "Failed to get repository tree: boom. Try https://gitingest.com/https://github.com/o/r instead"
+            },
+        )
+
+    async def test_summary_error_is_reported_unwrapped(self):
+        with mock.patch("gitingest.ingest", side_effect=RuntimeError("boom")):
+            result = await server.git_summary("o", "r")
+
+        self.assertEqual(
+            result,
+            {
+                "error": "Failed to get repository summary: boom. Try https://gitingest.com/https://github.com/o/r instead"
+            },
+        )
+
+    async def test_missing_file_error_is_cached(self):
+        first = await server.git_files("o", "r", "nope.py")
+        self.github.requests.clear()
+        second = await server.git_files("o", "r", "nope.py")
+
+        self.assertEqual(first, {"error": server._NO_FILES_FOUND_ERROR})
+        self.assertEqual(second, first)
+        self.assertEqual(self.github.requests, [])
+
+    async def test_transient_failure_is_not_cached(self):
+        ingest_once = self.github.ingest
+        calls = []
+
+        def flaky_ingest(url):
+            calls.append(url)
+            if len(calls) == 1:
+                raise TimeoutError("clone timed out")
+            return ingest_once(url)
+
+        with mock.patch("gitingest.ingest", flaky_ingest):
+            first = await server.git_tree("o", "r")
+            second = await server.git_tree("o", "r")
+
+        self.assertIn("clone timed out", first["error"])
+        self.assertEqual(second, "README.md\nsrc/a.py")
+        self.assertEqual(len(calls), 2)
+
+
+class TestFileFetching(ServerTestCase):
+
+    async def test_exact_paths_are_fetched_without_ingest(self):
+        files = await server.git_files("o", "r", "src/a.py,README.md")
+
+        self.assertIn("A = 1", files)
+        self.assertIn("# Title", files)
+        self.assertEqual(self.github.ingests, 0)
+
+    async def test_partial_result_names_missing_paths(self):
+        files = await server.git_files("o", "r", "src/a.py,nope.py")
+
+        self.assertIn("A = 1", files)
+        self.assertTrue(files.endswith("\n\nNot found: nope.py"))
+
+    async def test_unresolved_path_uses_tree_not_ingest(self):
+        files = await server.git_files("o", "r", "a.py")
+
+        self.assertIn("A = 1", files)
+        self.assertEqual(self.github.ingests, 0)
+        self.assertIn("/repos/o/r/git/blobs/sha-src/a.py", self.github.paths())
+
+    async def test_failed_blob_fetch_falls_back_to_ingest(self):
+        self.github.blob_status = 403
+
+        files = await server.git_files("o", "r", "a.py")
+
+        self.assertIn("A = 1", files)
+        self.assertEqual(self.github.ingests, 1)
+
+
+class TestRateLimit(ServerTestCase):
+
+    async def test_exhausted_rate_limit_skips_optional_requests(self):
+        self.github.rate_limited = True
+
+        files = await server.git_files("o", "r", "a.py")
+
+        # Only the first direct fetch is sent; the tree and head-commit
+        # requests are skipped and the file comes from the ingest
+        self.assertIn("A = 1", files)
+        self.assertEqual(self.github.paths(), ["/repos/o/r/contents/a.py"])
+        self.assertEqual(self.github.ingests, 1)
+
+        self.github.requests.clear()
+        await server.git_files("o", "other", "a.py")
+
+        self.assertEqual(self.github.requests, [])
+
+    async def test_github_client_records_rate_limits(self):
+        client = ingest.create_github_client()
+        self.addAsyncCleanup(client.aclose)
+
+        self.assertIn(ingest._record_rate_limit, client.event_hooks["response"])
+
+
+class TestBatchWindow(unittest.TestCase):
+
+    def test_parse_batch_window(self):
+        self.assertEqual(server._parse_batch_window(None), 0.02)
+        self.assertEqual(server._parse_batch_window(""), 0.02)
+        self.assertEqual(server._parse_batch_window("abc"), 0.02)
+        self.assertEqual(server._parse_batch_window("50"), 0.05)
+        self.assertEqual(server._parse_batch_window("-5"), 0.0)
+
+
+class TestFileFetchingWithToken(ServerTestCase):
+
+    token = "test-token"
+
+    async def test_concurrent_git_files_share_one_graphql_query(self):
+        a, readme = await asyncio.gather(
+            server.git_files("o", "r", "src/a.py"),
+            server.git_files("o", "r", "README.md"),
+        )
+
+        self.assertIn("A = 1", a)
+        self.assertNotIn("# Title", a)
+        self.assertIn("# Title", readme)
+        self.assertEqual(self.github.paths(), ["/graphql"])
+
+
+if __name__ == "__main__":
+    unittest.main()